@@ -0,0 +1,63 @@
+# cache.py
+"""
+In-process TTL caches for hot lookups.
+
+Every message or callback triggers several get_user round-trips for the
+same row (check_user, start, the individual handlers). Caching the row
+here for a short window turns the repeated reads within one interaction
+into dict lookups; the write helpers in database.py invalidate entries
+so updates are visible on the next read.
+"""
+
+import time
+
+import database as db
+
+_USER_TTL = 60.0
+_user_cache: dict[int, tuple] = {}
+
+
+async def get_user_cached(user_id):
+    """Returns the user's row, served from cache when fresh."""
+    entry = _user_cache.get(user_id)
+    if entry and time.monotonic() < entry[1]:
+        return entry[0]
+    row = await db.get_user(user_id)
+    if row is not None:
+        _user_cache[user_id] = (row, time.monotonic() + _USER_TTL)
+    return row
+
+
+_CHANNEL_TTL = 3600.0
+_channel_cache: dict[int, tuple] = {}
+
+
+async def get_channel_info_cached(bot, channel_id):
+    """Returns (title, invite_link) for a force-join channel.
+
+    The same channel is served to many users in a row, so the first
+    render pays the get_chat (and possibly export_chat_invite_link)
+    round-trips and the rest read from memory for an hour.
+    """
+    entry = _channel_cache.get(channel_id)
+    if entry and time.monotonic() < entry[2]:
+        return entry[0], entry[1]
+    chat = await bot.get_chat(channel_id)
+    invite_link = chat.invite_link or await bot.export_chat_invite_link(chat_id=channel_id)
+    _channel_cache[channel_id] = (chat.title, invite_link, time.monotonic() + _CHANNEL_TTL)
+    return chat.title, invite_link
+
+
+def invalidate_channel(channel_id):
+    """Drops a channel's cached info after its owner re-registers it."""
+    _channel_cache.pop(channel_id, None)
+
+
+def invalidate_user(user_id):
+    """Drops one user's cached row after a write touches it."""
+    _user_cache.pop(user_id, None)
+
+
+def clear_users():
+    """Drops every cached row; used by the full-table reset jobs."""
+    _user_cache.clear()
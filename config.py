@@ -10,7 +10,7 @@ It's recommended to use environment variables for production.
 BOT_TOKEN = "7247516860:AAHuQTtndmvfh5R7A2mmKekGCI8gNkSYAQE"
 
 # TODO: Replace with the Telegram user IDs of the bot administrators
-ADMIN_IDS = [7507183871, 987654321] 
+ADMIN_IDS = frozenset({7507183871, 987654321}) 
 
 # TODO: Replace with your own username (without the @) for the "Contact Admin" button
 OWNER_USERNAME = "patelkrish_99"
@@ -4,289 +4,571 @@ Handles all database operations for the bot using aiosqlite.
 
 This module provides an asynchronous interface for creating tables,
 adding/updating users, managing promotions, groups, and all other
-persistent data. Each function opens and closes its own connection
-to ensure thread safety in an async environment.
+persistent data. All functions share a pool of long-lived connections
+so the per-call connect/teardown cost is paid only once at startup.
 """
 
 import aiosqlite
+import asyncio
 import logging
+import random
+import re
+import time
 from datetime import datetime, timedelta
 
+from aiosqlitepool import SQLiteConnectionPool
+
+# Imported for cache invalidation on user writes; cache.py imports this
+# module back, but both only touch each other at call time.
+import cache
+
 DB_NAME = 'promotion_bot.db'
 logger = logging.getLogger(__name__)
 
+_read_pool: SQLiteConnectionPool | None = None
+
+async def _apply_common_pragmas(db):
+    db.row_factory = aiosqlite.Row
+    await db.execute('PRAGMA temp_store=MEMORY')
+    await db.execute('PRAGMA mmap_size=268435456')
+    await db.execute('PRAGMA cache_size=-20000')
+    await db.execute('PRAGMA busy_timeout=5000')
+
+async def _connection_factory():
+    """Opens the read-write connection used by the writer task."""
+    # cached_statements sizes sqlite3's built-in per-connection LRU of
+    # compiled statements; with pooled long-lived connections every helper's
+    # SQL is parsed and planned once, then only re-bound on later calls.
+    db = await aiosqlite.connect(DB_NAME, cached_statements=256)
+    await _apply_common_pragmas(db)
+    # WAL lets readers run alongside the single writer and halves fsyncs.
+    await db.execute('PRAGMA journal_mode=WAL')
+    await db.execute('PRAGMA synchronous=NORMAL')
+    # Per the SQLite docs, this arms optimize to track which tables the
+    # connection touches so the closing PRAGMA optimize stays cheap.
+    await db.execute('PRAGMA optimize=0x10002')
+    return db
+
+async def _ro_connection_factory():
+    """Opens a pooled read-only connection for the SELECT helpers.
+
+    mode=ro connections skip the write-lock bookkeeping entirely, so the
+    read-heavy helpers never contend with the writer. The journal-mode
+    PRAGMAs are write-side settings and are left to the writer connection.
+    """
+    db = await aiosqlite.connect(f'file:{DB_NAME}?mode=ro', uri=True, cached_statements=256)
+    await _apply_common_pragmas(db)
+    return db
+
+async def init_pool():
+    """Creates the shared read pool. Safe to call more than once."""
+    global _read_pool
+    if _read_pool is None:
+        _read_pool = SQLiteConnectionPool(_ro_connection_factory)
+        logger.info("Read-only database connection pool created.")
+
+async def close_pool():
+    """Closes every open connection. Called on bot shutdown."""
+    global _read_pool, _writer_task, _write_conn
+    if _writer_task is not None and not _writer_task.done():
+        # Callers await their writes, so the queue is drained by now.
+        _writer_task.cancel()
+        _writer_task = None
+    if _write_conn is not None:
+        # Refresh planner statistics if they went stale; no-op otherwise.
+        await _write_conn.execute('PRAGMA optimize')
+        await _write_conn.close()
+        _write_conn = None
+    if _read_pool is not None:
+        await _read_pool.close()
+        _read_pool = None
+        logger.info("Read-only database connection pool closed.")
+
 def get_db():
-    """Returns a connection context manager to the database."""
-    return aiosqlite.connect(DB_NAME)
+    """Returns a pooled read-only connection context manager."""
+    return _read_pool.connection()
+
+# --- Single-writer queue ---
+#
+# WAL allows exactly one writer at a time; concurrent commits from many
+# handlers would ping-pong on the write lock. All mutations are funnelled
+# through one asyncio task that drains the queue and batches consecutive
+# writes into a single transaction. Readers keep using the pool directly.
+_WRITE_BATCH_MAX = 50
+_write_queue: asyncio.Queue | None = None
+_writer_task: asyncio.Task | None = None
+_write_conn: aiosqlite.Connection | None = None
+
+async def _get_write_conn():
+    """Returns the writer task's dedicated long-lived connection, opening it
+    on first use. Keeping it out of the pool avoids an acquire/release pair
+    per batch and leaves the pooled connections free for readers."""
+    global _write_conn
+    if _write_conn is None:
+        _write_conn = await _connection_factory()
+    return _write_conn
+
+async def _run_write(sql, params=()):
+    """Queues one mutating statement and returns its (rowcount, row) result."""
+    results = await _run_write_many([(sql, params)])
+    return results[0]
+
+async def _run_write_many(statements):
+    """Queues several statements as one atomic unit for the writer task."""
+    global _write_queue, _writer_task
+    if _write_queue is None:
+        _write_queue = asyncio.Queue()
+    if _writer_task is None or _writer_task.done():
+        _writer_task = asyncio.get_running_loop().create_task(_writer_loop())
+    future = asyncio.get_running_loop().create_future()
+    _write_queue.put_nowait((statements, future))
+    return await future
+
+async def _writer_loop():
+    while True:
+        batch = [await _write_queue.get()]
+        while not _write_queue.empty() and len(batch) < _WRITE_BATCH_MAX:
+            batch.append(_write_queue.get_nowait())
+        db = await _get_write_conn()
+        if len(batch) == 1:
+            await _apply_write(db, *batch[0])
+            continue
+        try:
+            await db.execute('BEGIN IMMEDIATE')
+            pending = [(future, await _execute_statements(db, statements))
+                       for statements, future in batch]
+            await db.execute('COMMIT')
+            for future, results in pending:
+                if not future.done():
+                    future.set_result(results)
+        except Exception:
+            # One bad statement must not sink its batch mates: roll the
+            # shared transaction back and replay each unit on its own.
+            await _try_rollback(db)
+            for statements, future in batch:
+                await _apply_write(db, statements, future)
+
+async def _apply_write(db, statements, future):
+    try:
+        await db.execute('BEGIN IMMEDIATE')
+        results = await _execute_statements(db, statements)
+        await db.execute('COMMIT')
+        if not future.done():
+            future.set_result(results)
+    except Exception as exc:
+        await _try_rollback(db)
+        if not future.done():
+            future.set_exception(exc)
+
+async def _execute_statements(db, statements):
+    results = []
+    for sql, params in statements:
+        cursor = await db.execute(sql, params)
+        row = await cursor.fetchone()
+        results.append((cursor.rowcount, row))
+    return results
+
+async def _try_rollback(db):
+    try:
+        await db.execute('ROLLBACK')
+    except Exception:
+        pass
 
 async def initialize_database():
     """
     Creates all necessary tables if they don't exist and performs schema migrations.
     This should be called once when the bot starts.
     """
-    async with get_db() as db:
-        # --- Table Creations ---
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                credits INTEGER DEFAULT 5,
-                referral_credits INTEGER DEFAULT 0,
-                inviter_id INTEGER,
-                is_premium BOOLEAN DEFAULT FALSE,
-                premium_expiry DATE,
-                is_banned BOOLEAN DEFAULT FALSE,
-                daily_promo_runs INTEGER DEFAULT 2,
-                image_broadcasts_left INTEGER DEFAULT 100,
-                normal_promo_text TEXT,
-                normal_promo_url TEXT,
-                normal_promo_chat_id INTEGER,
-                normal_promo_message_id INTEGER,
-                force_join_channel_id INTEGER,
-                clicks_received INTEGER DEFAULT 0
-            )
-        ''')
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS groups (
-                group_id INTEGER PRIMARY KEY,
-                added_by_user_id INTEGER,
-                is_admin BOOLEAN DEFAULT FALSE,
-                UNIQUE(group_id)
-            )
-        ''')
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS promotions (
-                promo_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                promoter_user_id INTEGER,
-                promo_type TEXT,
-                channel_id INTEGER,
-                promo_text TEXT,
-                promo_url TEXT,
-                budget INTEGER DEFAULT 0,
-                promo_chat_id INTEGER,
-                promo_message_id INTEGER
-            )
-        ''')
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS claimed_promos (
-                user_id INTEGER,
-                promo_id INTEGER,
-                PRIMARY KEY (user_id, promo_id)
-            )
-        ''')
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS feature_flags (
-                name TEXT PRIMARY KEY,
-                is_enabled BOOLEAN DEFAULT TRUE
-            )
-        ''')
-        
-        flags = ['group_promotion', 'force_join_promotion', 'premium_image_caption']
-        for flag in flags:
-            await db.execute('INSERT OR IGNORE INTO feature_flags (name) VALUES (?)', (flag,))
-
-        # --- Schema Migrations ---
-        logger.info("Checking for necessary schema migrations...")
-        
-        # Migration for users table
-        cursor = await db.execute("PRAGMA table_info(users)")
-        columns = [row[1] for row in await cursor.fetchall()]
-        if 'normal_promo_chat_id' not in columns:
-            logger.info("Adding 'normal_promo_chat_id' to 'users' table.")
-            await db.execute('ALTER TABLE users ADD COLUMN normal_promo_chat_id INTEGER')
-        if 'normal_promo_message_id' not in columns:
-            logger.info("Adding 'normal_promo_message_id' to 'users' table.")
-            await db.execute('ALTER TABLE users ADD COLUMN normal_promo_message_id INTEGER')
-
-        # Migration for promotions table
-        cursor = await db.execute("PRAGMA table_info(promotions)")
-        columns = [row[1] for row in await cursor.fetchall()]
-        if 'promo_chat_id' not in columns:
-            logger.info("Adding 'promo_chat_id' to 'promotions' table.")
-            await db.execute('ALTER TABLE promotions ADD COLUMN promo_chat_id INTEGER')
-        if 'promo_message_id' not in columns:
-            logger.info("Adding 'promo_message_id' to 'promotions' table.")
-            await db.execute('ALTER TABLE promotions ADD COLUMN promo_message_id INTEGER')
-
-        await db.commit()
-        logger.info("Database initialization and migration check complete.")
+    # DDL runs on the write connection; it also creates the database file
+    # (and its WAL sidecars) before any read-only connection opens it.
+    db = await _get_write_conn()
+    # --- Table Creations ---
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            credits INTEGER DEFAULT 5,
+            referral_credits INTEGER DEFAULT 0,
+            inviter_id INTEGER,
+            is_premium BOOLEAN DEFAULT FALSE,
+            premium_expiry DATE,
+            is_banned BOOLEAN DEFAULT FALSE,
+            daily_promo_runs INTEGER DEFAULT 2,
+            image_broadcasts_left INTEGER DEFAULT 100,
+            normal_promo_text TEXT,
+            normal_promo_url TEXT,
+            normal_promo_chat_id INTEGER,
+            normal_promo_message_id INTEGER,
+            force_join_channel_id INTEGER,
+            clicks_received INTEGER DEFAULT 0
+        )
+    ''')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS groups (
+            group_id INTEGER PRIMARY KEY,
+            added_by_user_id INTEGER,
+            is_admin BOOLEAN DEFAULT FALSE,
+            UNIQUE(group_id)
+        )
+    ''')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS promotions (
+            promo_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            promoter_user_id INTEGER,
+            promo_type TEXT,
+            channel_id INTEGER,
+            promo_text TEXT,
+            promo_url TEXT,
+            budget INTEGER DEFAULT 0,
+            promo_chat_id INTEGER,
+            promo_message_id INTEGER
+        )
+    ''')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS claimed_promos (
+            user_id INTEGER,
+            promo_id INTEGER,
+            PRIMARY KEY (user_id, promo_id)
+        )
+    ''')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS feature_flags (
+            name TEXT PRIMARY KEY,
+            is_enabled BOOLEAN DEFAULT TRUE
+        )
+    ''')
+    
+    flags = ['group_promotion', 'force_join_promotion', 'premium_image_caption']
+    await db.executemany('INSERT OR IGNORE INTO feature_flags (name) VALUES (?)', [(flag,) for flag in flags])
+
+    # --- Schema Migrations ---
+    logger.info("Checking for necessary schema migrations...")
+
+    # One sqlite_master probe covers both tables; the cached CREATE SQL
+    # tells us which columns exist, so up-to-date databases skip the
+    # ALTERs (and their schema rewrites) entirely.
+    expected_columns = {
+        'users': ('normal_promo_chat_id', 'normal_promo_message_id'),
+        'promotions': ('promo_chat_id', 'promo_message_id'),
+    }
+    cursor = await db.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ('users', 'promotions')")
+    schemas = {name: sql for name, sql in await cursor.fetchall()}
+    for table, columns in expected_columns.items():
+        for column in columns:
+            # Match on identifier boundaries: a plain substring test would
+            # treat e.g. 'promo_chat_id' as present inside
+            # 'normal_promo_chat_id' and silently skip the ALTER.
+            if not re.search(rf'\b{column}\b', schemas.get(table, '')):
+                logger.info(f"Adding '{column}' to '{table}' table.")
+                await db.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER')
+
+    # --- Indexes for the hot query predicates ---
+    # Partial indexes keep the common filters (not banned, budget left,
+    # admin groups, leaderboard) off full table scans as data grows.
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_users_notbanned ON users(is_banned) WHERE is_banned = FALSE')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_users_clicks ON users(clicks_received DESC) WHERE clicks_received > 0')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_promos_budget ON promotions(promoter_user_id) WHERE budget > 0')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_groups_admin ON groups(is_admin) WHERE is_admin = TRUE')
+    await db.execute('ANALYZE')
+
+    await db.commit()
+    logger.info("Database initialization and migration check complete.")
+
+    # The read pool opens mode=ro connections, so it is created only after
+    # the DDL above has materialized the database file.
+    await init_pool()
+
+    # Warm the flag cache with one query instead of N lookups later.
+    expiry = time.monotonic() + _FLAG_CACHE_TTL
+    for name, is_enabled in await get_all_feature_flags():
+        _flag_cache[name] = (bool(is_enabled), expiry)
+
+    # Preload the banned-id set so the per-update ban check is a plain
+    # membership test instead of a row read.
+    _banned_ids.clear()
+    async with get_db() as rdb:
+        cursor = await rdb.execute('SELECT user_id FROM users WHERE is_banned = TRUE')
+        _banned_ids.update(row[0] for row in await cursor.fetchall())
+
+# --- SQL statement constants ---
+#
+# Every statement is hoisted here so helpers bind one stable string object
+# per call; sqlite3's per-connection statement cache then hits on identity
+# instead of re-hashing freshly built literals.
+_SQL_ADD_USER = 'INSERT OR IGNORE INTO users (user_id, username, inviter_id) VALUES (?, ?, ?) RETURNING *'
+_SQL_GET_USER = 'SELECT * FROM users WHERE user_id = ?'
+_SQL_USER_ID_PAGE = 'SELECT user_id FROM users WHERE is_banned = FALSE AND user_id > ? ORDER BY user_id LIMIT ?'
+_SQL_UPDATE_CREDITS = 'UPDATE users SET credits = credits + ? WHERE user_id = ?'
+_SQL_UPDATE_REFERRAL_CREDITS = 'UPDATE users SET referral_credits = referral_credits + ? WHERE user_id = ?'
+_SQL_BAN_USER = 'UPDATE users SET is_banned = ? WHERE user_id = ?'
+_SQL_SET_PREMIUM = '''
+    UPDATE users SET is_premium = TRUE, premium_expiry = ?, daily_promo_runs = 5, image_broadcasts_left = 100
+    WHERE user_id = ?
+'''
+_SQL_REMOVE_PREMIUM = '''
+    UPDATE users SET is_premium = FALSE, premium_expiry = NULL, daily_promo_runs = 2
+    WHERE user_id = ?
+'''
+_SQL_USE_PROMO_RUN = 'UPDATE users SET daily_promo_runs = daily_promo_runs - 1 WHERE user_id = ? AND daily_promo_runs > 0 RETURNING daily_promo_runs'
+_SQL_USE_IMAGE_BROADCAST_RUN = 'UPDATE users SET image_broadcasts_left = image_broadcasts_left - ? WHERE user_id = ? RETURNING image_broadcasts_left'
+_SQL_RANDOM_USERS = 'SELECT user_id FROM users WHERE user_id != ? AND is_banned = FALSE ORDER BY RANDOM() LIMIT ?'
+_SQL_SET_NORMAL_PROMO = 'UPDATE users SET normal_promo_text = ?, normal_promo_url = ?, normal_promo_chat_id = ?, normal_promo_message_id = ? WHERE user_id = ?'
+_SQL_SET_FORCE_JOIN_CHANNEL = 'UPDATE users SET force_join_channel_id = ? WHERE user_id = ?'
+_SQL_ADD_PROMOTION = 'INSERT INTO promotions (promoter_user_id, promo_type, budget, channel_id, promo_text, promo_url, promo_chat_id, promo_message_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+
+# Shared predicate for random-promotion sampling: NOT EXISTS anti-joins via
+# the (user_id, promo_id) primary key, an index-only probe per candidate row.
+_SQL_PROMO_PREDICATE = '''
+    FROM promotions p
+    WHERE p.promoter_user_id != ? AND p.budget > 0
+      AND NOT EXISTS (SELECT 1 FROM claimed_promos cp WHERE cp.user_id = ? AND cp.promo_id = p.promo_id)
+'''
+_SQL_COUNT_PROMOS = f'SELECT COUNT(*) {_SQL_PROMO_PREDICATE}'
+_SQL_PICK_PROMO = f'''SELECT p.promo_id, p.promoter_user_id, p.promo_type, p.channel_id, p.promo_text, p.promo_url, p.promo_chat_id, p.promo_message_id
+    {_SQL_PROMO_PREDICATE} LIMIT 1 OFFSET ?'''
+
+_SQL_CLAIM_PROMO = 'INSERT OR IGNORE INTO claimed_promos (user_id, promo_id) VALUES (?, ?)'
+# record_claim chains its statements through changes(): each step only fires
+# if the previous one modified a row, so an ignored claim insert (already
+# claimed) or an exhausted budget stops the rest of the unit.
+_SQL_CLAIM_DECREMENT_BUDGET = 'UPDATE promotions SET budget = budget - 1 WHERE promo_id = ? AND budget > 0 AND changes() > 0'
+_SQL_CLAIM_AWARD_CREDITS = 'UPDATE users SET credits = credits + ? WHERE user_id = ? AND changes() > 0'
+_SQL_CLAIM_COUNT_CLICK = 'UPDATE users SET clicks_received = clicks_received + 1 WHERE user_id = ? AND changes() > 0'
+_SQL_LEADERBOARD = 'SELECT username, clicks_received FROM users WHERE clicks_received > 0 ORDER BY clicks_received DESC LIMIT 10'
+_SQL_ADD_GROUP = 'INSERT INTO groups (group_id, added_by_user_id, is_admin) VALUES (?, ?, ?) ON CONFLICT(group_id) DO UPDATE SET is_admin = excluded.is_admin'
+_SQL_GET_GROUP = 'SELECT * FROM groups WHERE group_id = ?'
+_SQL_RANDOM_GROUPS = 'SELECT group_id FROM groups WHERE is_admin = TRUE ORDER BY RANDOM() LIMIT ?'
+_SQL_GET_FLAG = 'SELECT is_enabled FROM feature_flags WHERE name = ?'
+_SQL_SET_FLAG = 'UPDATE feature_flags SET is_enabled = ? WHERE name = ?'
+_SQL_GET_ALL_FLAGS = 'SELECT name, is_enabled FROM feature_flags'
+_SQL_DAILY_RESET = '''
+    UPDATE users SET
+        credits = credits + referral_credits,
+        daily_promo_runs = CASE WHEN is_premium THEN 5 ELSE 2 END
+'''
+_SQL_WEEKLY_RESET = 'UPDATE users SET clicks_received = 0'
+_SQL_RESET_IMAGE_BROADCASTS = 'UPDATE users SET image_broadcasts_left = 100 WHERE is_premium = TRUE'
 
 # --- User Management ---
 
 async def add_user(user_id, username, inviter_id=None):
-    async with get_db() as db:
-        await db.execute('INSERT OR IGNORE INTO users (user_id, username, inviter_id) VALUES (?, ?, ?)', (user_id, username, inviter_id))
-        await db.commit()
+    """Inserts the user if new and returns their row.
+
+    RETURNING hands back the inserted row in the same round-trip; when the
+    insert was ignored because the row already exists, fall back to a read.
+    """
+    _, row = await _run_write(_SQL_ADD_USER, (user_id, username, inviter_id))
+    cache.invalidate_user(user_id)
+    return row if row is not None else await get_user(user_id)
 
 async def get_user(user_id):
     async with get_db() as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        cursor = await db.execute(_SQL_GET_USER, (user_id,))
+        # The Row already supports key access; skip the per-call dict copy.
+        return await cursor.fetchone()
 
-async def get_all_user_ids():
-    async with get_db() as db:
-        cursor = await db.execute('SELECT user_id FROM users WHERE is_banned = FALSE')
-        rows = await cursor.fetchall()
-        return [row[0] for row in rows]
+async def iter_all_user_ids(batch=1000):
+    """Yields non-banned user ids in keyset-paged batches.
+
+    Each page is one primary-key range query, and the pooled connection is
+    released between pages, so a broadcast over a large user table never
+    pins a reader for its whole duration.
+    """
+    last_id = 0
+    while True:
+        async with get_db() as db:
+            cursor = await db.execute(_SQL_USER_ID_PAGE, (last_id, batch))
+            rows = await cursor.fetchall()
+        if not rows:
+            return
+        yield [row[0] for row in rows]
+        if len(rows) < batch:
+            return
+        last_id = rows[-1][0]
 
 async def update_user_credits(user_id, amount):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET credits = credits + ? WHERE user_id = ?', (amount, user_id))
-        await db.commit()
+    await _run_write(_SQL_UPDATE_CREDITS, (amount, user_id))
+    cache.invalidate_user(user_id)
 
 async def update_referral_credits(user_id, amount):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET referral_credits = referral_credits + ? WHERE user_id = ?', (amount, user_id))
-        await db.commit()
+    await _run_write(_SQL_UPDATE_REFERRAL_CREDITS, (amount, user_id))
+    cache.invalidate_user(user_id)
+
+# Mirror of users.is_banned, kept in memory; check_user consults it on
+# every update without touching the database.
+_banned_ids: set[int] = set()
+
+def is_banned(user_id) -> bool:
+    return user_id in _banned_ids
 
 async def ban_user(user_id, is_banned: bool):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET is_banned = ? WHERE user_id = ?', (is_banned, user_id))
-        await db.commit()
+    await _run_write(_SQL_BAN_USER, (is_banned, user_id))
+    if is_banned:
+        _banned_ids.add(user_id)
+    else:
+        _banned_ids.discard(user_id)
+    cache.invalidate_user(user_id)
 
 async def set_premium(user_id, days):
     expiry_date = datetime.now() + timedelta(days=days)
-    async with get_db() as db:
-        await db.execute('''
-            UPDATE users SET is_premium = TRUE, premium_expiry = ?, daily_promo_runs = 5, image_broadcasts_left = 100
-            WHERE user_id = ?
-        ''', (expiry_date.date(), user_id))
-        await db.commit()
+    await _run_write(_SQL_SET_PREMIUM, (expiry_date.date(), user_id))
+    cache.invalidate_user(user_id)
 
 async def remove_premium(user_id):
-    async with get_db() as db:
-        await db.execute('''
-            UPDATE users SET is_premium = FALSE, premium_expiry = NULL, daily_promo_runs = 2
-            WHERE user_id = ?
-        ''', (user_id,))
-        await db.commit()
+    await _run_write(_SQL_REMOVE_PREMIUM, (user_id,))
+    cache.invalidate_user(user_id)
 
 async def use_promo_run(user_id):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET daily_promo_runs = daily_promo_runs - 1 WHERE user_id = ? AND daily_promo_runs > 0', (user_id,))
-        await db.commit()
+    # RETURNING folds the follow-up "how many runs are left?" SELECT
+    # into the UPDATE, saving a round-trip per promo run.
+    _, row = await _run_write(_SQL_USE_PROMO_RUN, (user_id,))
+    cache.invalidate_user(user_id)
+    return row[0] if row else None
 
 async def use_image_broadcast_run(user_id, count):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET image_broadcasts_left = image_broadcasts_left - ? WHERE user_id = ?', (count, user_id))
-        await db.commit()
+    _, row = await _run_write(_SQL_USE_IMAGE_BROADCAST_RUN, (count, user_id))
+    cache.invalidate_user(user_id)
+    return row[0] if row else None
         
 async def get_random_users_for_broadcast(exclude_user_id, limit):
+    """Yields recipient ids as the cursor produces them.
+
+    Streaming lets the broadcast start sending while the sampling query is
+    still running instead of waiting for the full id list.
+    """
     async with get_db() as db:
-        cursor = await db.execute('SELECT user_id FROM users WHERE user_id != ? AND is_banned = FALSE ORDER BY RANDOM() LIMIT ?', (exclude_user_id, limit))
-        return [row[0] for row in await cursor.fetchall()]
+        cursor = await db.execute(_SQL_RANDOM_USERS, (exclude_user_id, limit))
+        async for row in cursor:
+            yield row[0]
 
 # --- Promotion Management ---
 
 async def set_normal_promo(user_id, text, url, chat_id, message_id):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET normal_promo_text = ?, normal_promo_url = ?, normal_promo_chat_id = ?, normal_promo_message_id = ? WHERE user_id = ?', (text, url, chat_id, message_id, user_id))
-        await db.commit()
+    await _run_write(_SQL_SET_NORMAL_PROMO, (text, url, chat_id, message_id, user_id))
+    cache.invalidate_user(user_id)
 
 async def set_force_join_channel(user_id, channel_id):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET force_join_channel_id = ? WHERE user_id = ?', (channel_id, user_id))
-        await db.commit()
+    await _run_write(_SQL_SET_FORCE_JOIN_CHANNEL, (channel_id, user_id))
+    cache.invalidate_user(user_id)
 
 async def add_promotion(user_id, promo_type, budget, channel_id=None, text=None, url=None, chat_id=None, message_id=None):
-    async with get_db() as db:
-        await db.execute(
-            'INSERT INTO promotions (promoter_user_id, promo_type, budget, channel_id, promo_text, promo_url, promo_chat_id, promo_message_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-            (user_id, promo_type, budget, channel_id, text, url, chat_id, message_id)
-        )
-        await db.commit()
+    await _run_write(_SQL_ADD_PROMOTION, (user_id, promo_type, budget, channel_id, text, url, chat_id, message_id))
 
 async def get_random_promotion(user_id):
     async with get_db() as db:
-        query = '''
-            SELECT p.promo_id, p.promoter_user_id, p.promo_type, p.channel_id, p.promo_text, p.promo_url, p.promo_chat_id, p.promo_message_id
-            FROM promotions p
-            LEFT JOIN claimed_promos cp ON p.promo_id = cp.promo_id AND cp.user_id = ?
-            WHERE p.promoter_user_id != ? AND cp.promo_id IS NULL AND p.budget > 0
-            ORDER BY RANDOM() LIMIT 1
-        '''
-        cursor = await db.execute(query, (user_id, user_id))
+        # Count the eligible rows and jump to a random offset instead of
+        # ORDER BY RANDOM(), which sorts the whole result set per call.
+        cursor = await db.execute(_SQL_COUNT_PROMOS, (user_id, user_id))
+        count = (await cursor.fetchone())[0]
+        if not count:
+            return None
+        cursor = await db.execute(_SQL_PICK_PROMO, (user_id, user_id, random.randrange(count)))
         return await cursor.fetchone()
 
-async def claim_promo(user_id, promo_id):
-    async with get_db() as db:
-        await db.execute('INSERT OR IGNORE INTO claimed_promos (user_id, promo_id) VALUES (?, ?)', (user_id, promo_id))
-        await db.commit()
-
-async def decrement_promo_budget(promo_id):
-    async with get_db() as db:
-        await db.execute('UPDATE promotions SET budget = budget - 1 WHERE promo_id = ? AND budget > 0', (promo_id,))
-        await db.commit()
-
-async def has_claimed_promo(user_id, promo_id):
-    async with get_db() as db:
-        cursor = await db.execute('SELECT 1 FROM claimed_promos WHERE user_id = ? AND promo_id = ?', (user_id, promo_id))
-        return await cursor.fetchone() is not None
+async def record_claim(user_id, promo_id, promoter_id, reward):
+    """Applies a whole claim as one transaction on the writer connection.
 
-async def increment_clicks_received(user_id):
-    async with get_db() as db:
-        await db.execute('UPDATE users SET clicks_received = clicks_received + 1 WHERE user_id = ?', (user_id,))
-        await db.commit()
+    Inserts the claim, takes a budget slot, awards the claimer's credits and
+    counts the promoter's click in a single queue unit — one fsync instead
+    of four, and atomic against concurrent claims: the budget decrement only
+    applies while budget > 0, so two users racing for the last slot cannot
+    both be rewarded. Returns 'ok', 'already_claimed', or 'sold_out' (the
+    losing racer keeps a claim row, which just hides the dead promotion
+    from their task feed).
+    """
+    results = await _run_write_many([
+        (_SQL_CLAIM_PROMO, (user_id, promo_id)),
+        (_SQL_CLAIM_DECREMENT_BUDGET, (promo_id,)),
+        (_SQL_CLAIM_AWARD_CREDITS, (reward, user_id)),
+        (_SQL_CLAIM_COUNT_CLICK, (promoter_id,)),
+    ])
+    cache.invalidate_user(user_id)
+    if results[0][0] == 0:
+        return 'already_claimed'
+    if results[1][0] == 0:
+        return 'sold_out'
+    return 'ok'
+
+async def claim_promos_bulk(pairs):
+    """Records many (user_id, promo_id) claims in a single transaction."""
+    await _run_write_many([(_SQL_CLAIM_PROMO, pair) for pair in pairs])
+
+async def add_promotions_bulk(rows):
+    """Inserts many promotions at once; rows mirror add_promotion's columns."""
+    await _run_write_many([(_SQL_ADD_PROMOTION, row) for row in rows])
 
 async def get_leaderboard():
     async with get_db() as db:
-        cursor = await db.execute('SELECT username, clicks_received FROM users WHERE clicks_received > 0 ORDER BY clicks_received DESC LIMIT 10')
+        cursor = await db.execute(_SQL_LEADERBOARD)
         return await cursor.fetchall()
         
 # --- Group Management ---
 
 async def add_group(group_id, added_by_user_id, is_admin):
-    async with get_db() as db:
-        await db.execute('INSERT INTO groups (group_id, added_by_user_id, is_admin) VALUES (?, ?, ?) ON CONFLICT(group_id) DO UPDATE SET is_admin = excluded.is_admin',
-                         (group_id, added_by_user_id, is_admin))
-        await db.commit()
+    await _run_write(_SQL_ADD_GROUP, (group_id, added_by_user_id, is_admin))
 
 async def get_group(group_id):
     async with get_db() as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute('SELECT * FROM groups WHERE group_id = ?', (group_id,))
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        cursor = await db.execute(_SQL_GET_GROUP, (group_id,))
+        return await cursor.fetchone()
 
 async def get_random_groups(limit):
     async with get_db() as db:
-        cursor = await db.execute('SELECT group_id FROM groups WHERE is_admin = TRUE ORDER BY RANDOM() LIMIT ?', (limit,))
+        cursor = await db.execute(_SQL_RANDOM_GROUPS, (limit,))
         rows = await cursor.fetchall()
         return [row[0] for row in rows]
 
 # --- Feature Flags ---
+
+# The flags change essentially never, so reads on the promo/broadcast hot
+# paths are served from this short-lived in-process cache instead of SQLite.
+_FLAG_CACHE_TTL = 30.0
+_flag_cache: dict[str, tuple[bool, float]] = {}
+
 async def get_feature_flag(name):
+    cached = _flag_cache.get(name)
+    if cached and time.monotonic() < cached[1]:
+        return cached[0]
     async with get_db() as db:
-        cursor = await db.execute('SELECT is_enabled FROM feature_flags WHERE name = ?', (name,))
+        cursor = await db.execute(_SQL_GET_FLAG, (name,))
         row = await cursor.fetchone()
-        return row[0] if row else False
+        value = bool(row[0]) if row else False
+        _flag_cache[name] = (value, time.monotonic() + _FLAG_CACHE_TTL)
+        return value
 
 async def set_feature_flag(name, is_enabled: bool):
-    async with get_db() as db:
-        await db.execute('UPDATE feature_flags SET is_enabled = ? WHERE name = ?', (is_enabled, name))
-        await db.commit()
+    global _all_flags_cache
+    await _run_write(_SQL_SET_FLAG, (is_enabled, name))
+    _flag_cache.pop(name, None)
+    _all_flags_cache = None
+
+# Full flag list, cached briefly; the admin panel re-renders it on every
+# toggle and menu visit, and a toggle drops the cache immediately.
+_ALL_FLAGS_CACHE_TTL = 5.0
+_all_flags_cache: tuple[list, float] | None = None
 
 async def get_all_feature_flags():
+    global _all_flags_cache
+    if _all_flags_cache is not None and time.monotonic() < _all_flags_cache[1]:
+        return _all_flags_cache[0]
     async with get_db() as db:
-        cursor = await db.execute('SELECT name, is_enabled FROM feature_flags')
-        return await cursor.fetchall()
+        cursor = await db.execute(_SQL_GET_ALL_FLAGS)
+        flags = await cursor.fetchall()
+    _all_flags_cache = (flags, time.monotonic() + _ALL_FLAGS_CACHE_TTL)
+    return flags
 
 # --- Scheduled Job Queries ---
-async def execute_daily_reset():
-    async with get_db() as db:
-        await db.execute('UPDATE users SET credits = credits + referral_credits')
-        await db.execute('UPDATE users SET daily_promo_runs = 2 WHERE is_premium = FALSE')
-        await db.execute('UPDATE users SET daily_promo_runs = 5 WHERE is_premium = TRUE')
-        await db.commit()
+# The writer task brackets each unit in BEGIN IMMEDIATE / COMMIT, so the
+# full-table rewrites keep their single-transaction behavior.
+async def execute_midnight_reset():
+    """Runs both midnight resets as one atomic writer unit."""
+    await _run_write_many([
+        (_SQL_DAILY_RESET, ()),
+        (_SQL_RESET_IMAGE_BROADCASTS, ()),
+    ])
+    cache.clear_users()
 
 async def execute_weekly_reset():
-    async with get_db() as db:
-        await db.execute('UPDATE users SET clicks_received = 0')
-        await db.commit()
-
-async def reset_all_premium_image_broadcasts():
-    async with get_db() as db:
-        await db.execute('UPDATE users SET image_broadcasts_left = 100 WHERE is_premium = TRUE')
-        await db.commit()
+    await _run_write(_SQL_WEEKLY_RESET)
+    cache.clear_users()
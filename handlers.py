@@ -9,14 +9,18 @@ admin functionalities.
 import logging
 import asyncio
 import math
+import re
+from collections import Counter
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode, ChatType
-from telegram.error import TelegramError
+from telegram.error import Forbidden, RetryAfter, TelegramError
 
+import cache
 import config
 import database as db
-from keyboards import main_menu_keyboard, promotion_management_keyboard, feature_flags_keyboard
+from ratelimit import TokenBucket
+from keyboards import main_menu_keyboard, promotion_management_keyboard, feature_flags_keyboard, clear_flags_keyboard_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +33,44 @@ AWAIT_IMAGE_FOR_BROADCAST, AWAIT_BROADCAST_COUNT = range(4, 6)
 # Admin Conversation States
 BROADCAST_MESSAGE = range(10, 11)
 AWAIT_USER_ID_FOR_PREMIUM, AWAIT_PREMIUM_DAYS = range(11, 13)
-AWAIT_USER_ID_FOR_REMOVE_PREMIUM = range(13, 14)
-AWAIT_USER_ID_FOR_BAN = range(14, 15)
-AWAIT_USER_ID_FOR_UNBAN = range(15, 16)
-AWAIT_USER_ID_FOR_STATS = range(16, 17)
+AWAIT_ADMIN_TARGET_ID = range(13, 14)
+
+
+async def _award_referral(context: ContextTypes.DEFAULT_TYPE, inviter_id: int, username: str) -> None:
+    """Credits the inviter and notifies them; runs as a background task."""
+    try:
+        await db.update_referral_credits(inviter_id, 2)
+        await context.bot.send_message(chat_id=inviter_id, text=f"🎉 New user @{username} joined via your link! You get +2 permanent daily credits.")
+    except TelegramError as e:
+        logger.warning(f"Could not credit inviter {inviter_id}: {e}")
+
+
+async def reset_update_memo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drops the memoized user row before any other handler runs.
+
+    Registered as a group -1 TypeHandler in main, so every update —
+    messages, commands, callbacks, conversation entries — starts from a
+    fresh read instead of a row memoized by an earlier interaction.
+    """
+    if context.user_data is not None:
+        context.user_data.pop('_user_row', None)
+
+
+async def _load_user(update: Update, context: ContextTypes.DEFAULT_TYPE, force: bool = False):
+    """Returns the effective user's row, fetched at most once per update.
+
+    The row is memoized on context.user_data (cleared per update by
+    reset_update_memo) so the handler chain for a single interaction
+    (check_user -> start -> menu handler) shares one lookup. Pass
+    force=True right after a write to re-read the fresh row.
+    """
+    if force:
+        context.user_data.pop('_user_row', None)
+    if '_user_row' not in context.user_data:
+        row = await cache.get_user_cached(update.effective_user.id)
+        # Stored as a plain dict so the persistence layer can pickle it.
+        context.user_data['_user_row'] = dict(row) if row is not None else None
+    return context.user_data['_user_row']
 
 
 async def check_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
@@ -41,37 +79,39 @@ async def check_user(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool
     Returns True if the user is okay to proceed, False otherwise.
     """
     user = update.effective_user
-    db_user = await db.get_user(user.id)
-
-    if db_user and db_user['is_banned']:
+    # Membership test against the preloaded banned set: the 99% happy path
+    # never touches the database just to learn the user isn't banned.
+    if db.is_banned(user.id):
         if update.message: 
             await update.message.reply_text("You are banned from using this bot.")
         elif update.callback_query:
             await update.callback_query.answer("You are banned from using this bot.", show_alert=True)
         return False
 
+    db_user = await _load_user(update, context)
     if not db_user:
         inviter_id = None
         if context.args and update.effective_chat.type == ChatType.PRIVATE:
             try:
                 inviter_id = int(context.args[0])
                 if inviter_id != user.id:
-                    await db.update_referral_credits(inviter_id, 2)
-                    await context.bot.send_message(chat_id=inviter_id, text=f"🎉 New user @{user.username} joined via your link! You get +2 permanent daily credits.")
-            except (ValueError, IndexError, TelegramError): pass
-        await db.add_user(user.id, user.username, inviter_id)
+                    # Reward the inviter in the background so the new user's
+                    # welcome message isn't held up by someone else's I/O.
+                    context.application.create_task(_award_referral(context, inviter_id, user.username))
+            except (ValueError, IndexError): pass
+        context.user_data['_user_row'] = dict(await db.add_user(user.id, user.username, inviter_id))
     return True
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends the welcome message and main menu."""
     if update.message and not await check_user(update, context): return
     user, user_id = update.effective_user, update.effective_user.id
-    db_user = await db.get_user(user_id)
-    if not db_user: await db.add_user(user_id, user.username); db_user = await db.get_user(user_id)
+    db_user = await _load_user(update, context)
+    if not db_user: db_user = context.user_data['_user_row'] = dict(await db.add_user(user_id, user.username))
     credits, referral_credits = db_user['credits'], db_user['referral_credits']
     welcome_text = (f"👋 **Welcome, {user.first_name}!**\n\nPromote your content or earn credits by completing tasks.\n\n"
                     f"💰 **Balance:** `{credits}` Credits\n📈 **Daily Referral Bonus:** `{referral_credits}` Credits")
-    keyboard = await main_menu_keyboard(user_id)
+    keyboard = main_menu_keyboard(user_id)
     if update.callback_query:
         try:
             await update.callback_query.edit_message_text(welcome_text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
@@ -84,72 +124,93 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles all inline button presses that are not part of a conversation."""
     query, user_id = update.callback_query, update.effective_user.id
-    await query.answer()
-    if not await check_user(update, context):
-        return
-
     data = query.data
-    actions = {
-        'promote_link': lambda u, c: u.callback_query.edit_message_text("**🚀 Promotion Menu**\n\nSet up your content or create a new promotion.", reply_markup=promotion_management_keyboard(), parse_mode=ParseMode.MARKDOWN),
-        'start_group_share': start_group_share_flow,
-        'execute_group_share_final': execute_group_share,
-        'earn_credits': tasks,
-        'referral_link': referral,
-        'leaderboard': leaderboard,
-        'premium_upgrade': premium_info,
-        'add_to_group': add_to_group,
-        'my_account': my_account,
-        'back_to_main': start,
-        'admin_feature_flags': admin_feature_flags,
-        'admin_back': start,
-    }
-    if data in actions: await actions[data](update, context)
-    elif data.startswith('toggle_flag_'):
-        if user_id not in config.ADMIN_IDS: return
-        feature_name = data.replace('toggle_flag_', '')
-        current_status = await db.get_feature_flag(feature_name)
-        await db.set_feature_flag(feature_name, not current_status)
-        await admin_feature_flags(update, context, is_edit=True)
-    elif data.startswith('claim_'): await handle_claim_promo(update, context, data)
-    elif data.startswith('verify_'): await handle_verify_promo(update, context, data)
-    elif data.startswith('report_'): await handle_report_start(update, context, data)
+    # Only the first answer for a query reaches the client, so the ban
+    # checks run first: a banned press must surface the alert, not the
+    # empty acknowledgement.
+    if data in _VIEW_ONLY_CALLBACKS:
+        if db.is_banned(user_id):
+            await query.answer("You are banned from using this bot.", show_alert=True)
+            return
+    elif not await check_user(update, context):
+        # check_user already answered the query with the ban alert.
+        return
+    # claim/verify resolve their outcome first and answer with an alert on
+    # failure; the generic acknowledgement here would eat that feedback.
+    if data.partition('_')[0] not in _SELF_ANSWERING_PREFIXES:
+        await query.answer()
+
+    handler = _BUTTON_ACTIONS.get(data)
+    if handler:
+        return await handler(update, context)
+    # Parameterized callbacks dispatch on their first underscore token.
+    prefix_handler = _PREFIX_ACTIONS.get(data.partition('_')[0])
+    if prefix_handler:
+        await prefix_handler(update, context, data)
+
+async def _toggle_flag(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str) -> None:
+    if update.effective_user.id not in config.ADMIN_IDS: return
+    feature_name = data.replace('toggle_flag_', '')
+    current_status = await db.get_feature_flag(feature_name)
+    await db.set_feature_flag(feature_name, not current_status)
+    clear_flags_keyboard_cache()
+    await admin_feature_flags(update, context, is_edit=True)
+
+async def _show_promote_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await update.callback_query.edit_message_text("**🚀 Promotion Menu**\n\nSet up your content or create a new promotion.", reply_markup=promotion_management_keyboard(), parse_mode=ParseMode.MARKDOWN)
 
 async def handle_claim_promo(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
     query, user_id = update.callback_query, update.effective_user.id
     _, promo_id_str, promoter_id_str = data.split('_')
     promo_id, promoter_id = int(promo_id_str), int(promoter_id_str)
-    if await db.has_claimed_promo(user_id, promo_id):
+    # No pre-check round-trip: record_claim's INSERT OR IGNORE reports a
+    # duplicate claim in the same write.
+    db_user = await _load_user(update, context)
+    reward = REWARDS_NORMAL[bool(db_user and db_user['is_premium'])]
+    outcome = await db.record_claim(user_id, promo_id, promoter_id, reward)
+    if outcome == 'already_claimed':
         await query.answer("You have already completed this task.", show_alert=True); return
-    await db.claim_promo(user_id, promo_id)
-    await db.decrement_promo_budget(promo_id)
-    db_user = await db.get_user(user_id)
-    reward = 2 if db_user and db_user['is_premium'] else 1
-    await db.update_user_credits(user_id, reward)
-    await db.increment_clicks_received(promoter_id)
-    await query.edit_message_text(f"✅ Success! You've earned {reward} credit(s).")
-    try: await context.bot.send_message(promoter_id, f"🎉 Someone completed your normal promotion! You received +1 view.")
+    if outcome == 'sold_out':
+        await query.answer("This task has run out of budget.", show_alert=True); return
+    # The acknowledgement, confirmation edit and promoter ping are
+    # independent network calls; overlap them instead of paying the
+    # round-trips back to back.
+    await asyncio.gather(
+        query.answer(),
+        query.edit_message_text(f"✅ Success! You've earned {reward} credit(s)."),
+        _notify_promoter(context, promoter_id, "🎉 Someone completed your normal promotion! You received +1 view."),
+        return_exceptions=True,
+    )
+
+async def _notify_promoter(context: ContextTypes.DEFAULT_TYPE, promoter_id: int, text: str) -> None:
+    """Tells the promoter their promotion got a view; failures only log."""
+    try: await context.bot.send_message(promoter_id, text)
     except TelegramError as e: logger.warning(f"Could not notify promoter {promoter_id}: {e}")
 
 async def handle_verify_promo(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
     query, user_id = update.callback_query, update.effective_user.id
     _, promo_id_str, channel_id_str, promoter_id_str = data.split('_')
     promo_id, channel_id, promoter_id = int(promo_id_str), int(channel_id_str), int(promoter_id_str)
-    if await db.has_claimed_promo(user_id, promo_id):
-        await query.answer("You have already completed this task.", show_alert=True); return
     try:
         member = await context.bot.get_chat_member(chat_id=channel_id, user_id=user_id)
         if member.status in ['member', 'administrator', 'creator']:
-            await db.claim_promo(user_id, promo_id)
-            await db.decrement_promo_budget(promo_id)
-            db_user = await db.get_user(user_id)
-            reward = 4 if db_user and db_user['is_premium'] else 2
-            await db.update_user_credits(user_id, reward)
-            await db.increment_clicks_received(promoter_id)
-            await query.edit_message_text(f"✅ Verified! You've earned {reward} credits.")
-            try: await context.bot.send_message(promoter_id, "🎉 Someone joined your channel from a promotion! You received +1 view.")
-            except TelegramError as e: logger.warning(f"Could not notify promoter {promoter_id}: {e}")
+            db_user = await _load_user(update, context)
+            reward = REWARDS_VERIFY[bool(db_user and db_user['is_premium'])]
+            outcome = await db.record_claim(user_id, promo_id, promoter_id, reward)
+            if outcome == 'already_claimed':
+                await query.answer("You have already completed this task.", show_alert=True); return
+            if outcome == 'sold_out':
+                await query.answer("This task has run out of budget.", show_alert=True); return
+            await asyncio.gather(
+                query.answer(),
+                query.edit_message_text(f"✅ Verified! You've earned {reward} credits."),
+                _notify_promoter(context, promoter_id, "🎉 Someone joined your channel from a promotion! You received +1 view."),
+                return_exceptions=True,
+            )
         else: await query.answer("You haven't joined the channel yet.", show_alert=True)
-    except TelegramError as e: await query.edit_message_text(f"❌ Error: Could not verify membership. Error: {e}")
+    except TelegramError as e:
+        await query.answer()
+        await query.edit_message_text(f"❌ Error: Could not verify membership. Error: {e}")
 
 async def handle_report_start(update: Update, context: ContextTypes.DEFAULT_TYPE, data: str):
     query = update.callback_query
@@ -159,24 +220,60 @@ async def handle_report_start(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 # --- Main Feature Handlers ---
 async def referral(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    user_id, bot = update.effective_user.id, await context.bot.get_me()
+    user_id, bot = update.effective_user.id, context.bot_data['me']
     referral_link = f"https://t.me/{bot.username}?start={user_id}"
     text = f"👥 **Your Referral Link**\n\nShare this for **+2 permanent daily credits** per new user!\n\n`{referral_link}`"
-    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Menu", callback_data="back_to_main")]])
+    keyboard = BACK_TO_MAIN_KB
     if update.callback_query:
         await update.callback_query.edit_message_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
     else:
         await update.message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
 
+RANK_ICONS = ("🥇", "🥈", "🥉")
+
+# One process-wide send budget: every fan-out draws from the same bucket,
+# so simultaneous broadcasts cannot jointly exceed the bot's global rate.
+_SEND_BUCKET = TokenBucket()
+
+# Shared back-to-menu markups; identical copies were built inline all over
+# the handlers.
+BACK_TO_MAIN_KB = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Menu", callback_data="back_to_main")]])
+BACK_KB = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main")]])
+
+# Callbacks that only render existing state; they skip check_user's
+# registration path and rely on the in-memory ban test alone.
+_VIEW_ONLY_CALLBACKS = frozenset({
+    'back_to_main', 'my_account', 'leaderboard', 'referral_link',
+    'premium_upgrade', 'add_to_group', 'promote_link', 'admin_back',
+})
+
+# Prefix dispatches that answer the query themselves, with an alert on
+# failure outcomes; button_handler must not acknowledge these first.
+_SELF_ANSWERING_PREFIXES = frozenset({'claim', 'verify'})
+
+# Pretty labels for the admin stats report, derived once at import instead
+# of re-titling every column name per request.
+_STAT_LABELS = {name: name.replace('_', ' ').title() for name in (
+    'user_id', 'username', 'credits', 'referral_credits', 'inviter_id',
+    'is_premium', 'premium_expiry', 'is_banned', 'daily_promo_runs',
+    'image_broadcasts_left', 'normal_promo_text', 'normal_promo_url',
+    'normal_promo_chat_id', 'normal_promo_message_id',
+    'force_join_channel_id', 'clicks_received',
+)}
+
+# Reward / bonus tables indexed by int(is_premium).
+REWARDS_NORMAL = (1, 2)
+REWARDS_VERIFY = (2, 4)
+GROUP_BONUSES = (5, 10)
+
 async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     board = await db.get_leaderboard()
     text = "🏆 **Weekly Leaderboard (Top 10)**\n_Based on total views received._\n\n"
     if not board: text += "The leaderboard is empty."
     else:
-        for i, (username, clicks) in enumerate(board):
-            rank_icon = ["🥇", "🥈", "🥉"][i] if i < 3 else f"{i+1}."
-            text += f"{rank_icon} @{username or 'Anonymous'} - `{clicks}` views\n"
-    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Menu", callback_data="back_to_main")]])
+        text += "\n".join(f"{RANK_ICONS[i] if i < 3 else f'{i+1}.'} @{username or 'Anonymous'} - `{clicks}` views"
+                          for i, (username, clicks) in enumerate(board))
+    keyboard = BACK_TO_MAIN_KB
     if update.callback_query: await update.callback_query.edit_message_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
     else: await update.message.reply_text(text, reply_markup=keyboard, parse_mode=ParseMode.MARKDOWN)
 
@@ -184,7 +281,7 @@ async def tasks(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     promo = await db.get_random_promotion(user_id)
     if not promo:
-        text, keyboard = "No new tasks available. Check back later!", InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main")]])
+        text, keyboard = "No new tasks available. Check back later!", BACK_KB
         if update.callback_query: await update.callback_query.edit_message_text(text, reply_markup=keyboard); return
         else: await update.message.reply_text(text, reply_markup=keyboard); return
 
@@ -199,14 +296,16 @@ async def tasks(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.callback_query.message.delete()
 
     if promo_type == 'normal' and promo_chat_id and promo_message_id:
+        keyboard_buttons.insert(0, [InlineKeyboardButton("✅ Claim Credits", callback_data=f"claim_{promo_id}_{promoter_id}")])
+        keyboard_buttons.insert(0, [InlineKeyboardButton("🔗 Visit Link", url=promo_url)])
+        # copyMessage accepts the keyboard directly, so the task arrives as
+        # one API call instead of a copy plus a follow-up button message.
         await context.bot.copy_message(
             chat_id=user_id,
             from_chat_id=promo_chat_id,
-            message_id=promo_message_id
+            message_id=promo_message_id,
+            reply_markup=InlineKeyboardMarkup(keyboard_buttons)
         )
-        keyboard_buttons.insert(0, [InlineKeyboardButton("✅ Claim Credits", callback_data=f"claim_{promo_id}_{promoter_id}")])
-        keyboard_buttons.insert(0, [InlineKeyboardButton("🔗 Visit Link", url=promo_url)])
-        await context.bot.send_message(user_id, "Complete the task above to earn credits.", reply_markup=InlineKeyboardMarkup(keyboard_buttons))
 
     elif promo_type == 'normal':
         text = f"**Task: Visit Link**\n\n{promo_text}"
@@ -216,11 +315,10 @@ async def tasks(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     else: # force_join
         try:
-            chat = await context.bot.get_chat(channel_id)
-            invite_link = chat.invite_link or await context.bot.export_chat_invite_link(chat_id=channel_id)
-            text = f"**Task: Join Channel**\n\nJoin **{chat.title}** to earn credits."
+            title, invite_link = await cache.get_channel_info_cached(context.bot, channel_id)
+            text = f"**Task: Join Channel**\n\nJoin **{title}** to earn credits."
             keyboard_buttons.insert(0, [InlineKeyboardButton("✅ Verify & Claim", callback_data=f"verify_{promo_id}_{channel_id}_{promoter_id}")])
-            keyboard_buttons.insert(0, [InlineKeyboardButton(f"➡️ Join {chat.title}", url=invite_link)])
+            keyboard_buttons.insert(0, [InlineKeyboardButton(f"➡️ Join {title}", url=invite_link)])
             await context.bot.send_message(user_id, text, reply_markup=InlineKeyboardMarkup(keyboard_buttons), parse_mode=ParseMode.MARKDOWN)
         except TelegramError as e:
             logger.error(f"Error fetching channel for task: {e}")
@@ -232,7 +330,7 @@ async def premium_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.callback_query.edit_message_text(text, reply_markup=keyboard)
 
 async def add_to_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    bot = await context.bot.get_me()
+    bot = context.bot_data['me']
     add_link = f"https://t.me/{bot.username}?startgroup={update.effective_user.id}"
     text = "➕ **Add Me to Your Group**\n\nAdd me to your group & make me admin for a credit bonus!\n\n`+5` (Normal) / `+10` (Premium)"
     keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("➕ Add to Group", url=add_link)], [InlineKeyboardButton("⬅️ Back", callback_data="back_to_main")]])
@@ -240,19 +338,19 @@ async def add_to_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 async def my_account(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query, user_id = update.callback_query, update.effective_user.id
-    user_data = await db.get_user(user_id)
+    user_data = await _load_user(update, context)
     if not user_data: await query.edit_message_text("Could not find your account details."); return
     premium_status = "Yes ✅" if user_data['is_premium'] else "No ❌"
     if user_data['is_premium'] and user_data['premium_expiry']: premium_status += f" (Expires: {user_data['premium_expiry']})"
     normal_promo = f"`{user_data['normal_promo_text']}`\nURL: `{user_data['normal_promo_url']}`" if user_data['normal_promo_text'] else "`Not set`"
-    if user_data.get('normal_promo_chat_id'):
+    if user_data['normal_promo_chat_id']:
         normal_promo += "\n_(Formatting is preserved for broadcast)_"
     force_join = f"`{user_data['force_join_channel_id']}`" if user_data['force_join_channel_id'] else "`Not set`"
     text = (f"👤 **My Account**\n\n**ID:** `{user_id}` | **Username:** @{user_data['username']}\n"
             f"**Credits:** `{user_data['credits']}`\n**Daily Referral Bonus:** `{user_data['referral_credits']}`\n**Premium:** {premium_status}\n\n"
             f"**Usage:**\n - Group Promos Left: `{user_data['daily_promo_runs']}`\n - Image Broadcasts Left: `{user_data['image_broadcasts_left']}`\n\n"
             f"**Saved Promotions:**\n - **Normal Link:**\n{normal_promo}\n - **Force-Join Channel:** {force_join}")
-    await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main")]]), parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
+    await query.edit_message_text(text, reply_markup=BACK_KB, parse_mode=ParseMode.MARKDOWN, disable_web_page_preview=True)
 
 # --- Conversation Handlers ---
 async def cancel_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -293,18 +391,20 @@ async def get_channel_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id, channel_input = update.effective_user.id, update.message.text
     await update.message.reply_text(f"Checking `{channel_input}`...", parse_mode=ParseMode.MARKDOWN)
     try:
-        chat, bot_member = await context.bot.get_chat(channel_input), await context.bot.get_chat_member(channel_input, context.bot.id)
+        # Independent API calls; fetch the chat and our membership in parallel.
+        chat, bot_member = await asyncio.gather(context.bot.get_chat(channel_input), context.bot.get_chat_member(channel_input, context.bot.id))
         if bot_member.status != 'administrator': await update.message.reply_text("❌ **Error:** I'm not an admin there."); return CHANNEL_ID
         await db.set_force_join_channel(user_id, chat.id)
+        cache.invalidate_channel(chat.id)
         await update.message.reply_text(f"✅ **Force-join channel set to {chat.title}!**", parse_mode=ParseMode.MARKDOWN)
         await start(update, context); return ConversationHandler.END
     except TelegramError as e: await update.message.reply_text(f"❌ **Error:** Could not access channel. {e}"); return CHANNEL_ID
 
 async def create_promotion_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query, user = update.callback_query, await db.get_user(update.effective_user.id)
+    query, user = update.callback_query, await _load_user(update, context)
     buttons = []
-    if user.get('normal_promo_url'): buttons.append([InlineKeyboardButton("🔗 Normal Link Promo", callback_data="create_promo_normal")])
-    if user.get('force_join_channel_id'): buttons.append([InlineKeyboardButton("📣 Force-Join Promo", callback_data="create_promo_force_join")])
+    if user['normal_promo_url']: buttons.append([InlineKeyboardButton("🔗 Normal Link Promo", callback_data="create_promo_normal")])
+    if user['force_join_channel_id']: buttons.append([InlineKeyboardButton("📣 Force-Join Promo", callback_data="create_promo_force_join")])
     if not buttons: await query.answer("Set up a promotion link/channel first!", show_alert=True); return ConversationHandler.END
     buttons.append([InlineKeyboardButton("⬅️ Back", callback_data='promote_link')])
     await query.edit_message_text("Which of your saved promotions would you like to create a task for?", reply_markup=InlineKeyboardMarkup(buttons))
@@ -312,21 +412,21 @@ async def create_promotion_start(update: Update, context: ContextTypes.DEFAULT_T
 async def get_promotion_type_for_creation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query, promo_type = update.callback_query, update.callback_query.data.replace('create_promo_', '')
     context.user_data['promo_type_to_create'] = promo_type
-    user = await db.get_user(update.effective_user.id)
+    user = await _load_user(update, context)
     await query.message.reply_text(f"How many credits to spend? (1 credit = 1 user).\n\nBalance: `{user['credits']}`\n\n/cancel", parse_mode=ParseMode.MARKDOWN)
     return AWAIT_BUDGET
 async def get_promotion_budget(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id, message = update.effective_user.id, update.message
     try: budget = int(message.text)
     except ValueError: await message.reply_text("Please send a valid number."); return AWAIT_BUDGET
-    user = await db.get_user(user_id)
+    user = await _load_user(update, context, force=True)
     if not (0 < budget <= user['credits']): await message.reply_text(f"Invalid amount. Min: 1, Max: {user['credits']}."); return AWAIT_BUDGET
     promo_type = context.user_data['promo_type_to_create']
     if promo_type == 'normal':
         await db.add_promotion(
             user_id, 'normal', budget,
             text=user['normal_promo_text'], url=user['normal_promo_url'],
-            chat_id=user.get('normal_promo_chat_id'), message_id=user.get('normal_promo_message_id')
+            chat_id=user['normal_promo_chat_id'], message_id=user['normal_promo_message_id']
         )
     else: # force_join
         await db.add_promotion(user_id, 'force_join', budget, channel_id=user['force_join_channel_id'])
@@ -335,14 +435,14 @@ async def get_promotion_budget(update: Update, context: ContextTypes.DEFAULT_TYP
     context.user_data.clear(); await start(update, context); return ConversationHandler.END
 
 async def premium_broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query, user = update.callback_query, await db.get_user(update.effective_user.id)
+    query, user = update.callback_query, await _load_user(update, context)
     if not user['is_premium']: await query.answer("This is a premium-only feature.", show_alert=True); return ConversationHandler.END
     await query.message.reply_text("Send the image with caption to broadcast.\n\n/cancel"); return AWAIT_IMAGE_FOR_BROADCAST
 async def get_image_for_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.message
     context.user_data['broadcast_chat_id'] = message.chat_id
     context.user_data['broadcast_message_id'] = message.message_id
-    user = await db.get_user(update.effective_user.id)
+    user = await _load_user(update, context)
     await message.reply_text(f"Image received. How many users to send to?\n\n- Max: `{user['image_broadcasts_left']}`\n- Cost: 1 credit per 10 users.\n- Balance: `{user['credits']}`\n\n/cancel", parse_mode=ParseMode.MARKDOWN)
     return AWAIT_BROADCAST_COUNT
 
@@ -353,7 +453,7 @@ async def get_broadcast_count(update: Update, context: ContextTypes.DEFAULT_TYPE
     except ValueError:
         await message.reply_text("Send a valid number.")
         return AWAIT_BROADCAST_COUNT
-    user = await db.get_user(user_id)
+    user = await _load_user(update, context, force=True)
     cost = math.ceil(count / 10)
     if count <= 0:
         await message.reply_text("Must be positive.")
@@ -366,19 +466,35 @@ async def get_broadcast_count(update: Update, context: ContextTypes.DEFAULT_TYPE
         return AWAIT_BROADCAST_COUNT
     
     await message.reply_text("Starting broadcast...")
-    target_users, s, f = await db.get_random_users_for_broadcast(user_id, count), 0, 0
     chat_id = context.user_data['broadcast_chat_id']
     message_id = context.user_data['broadcast_message_id']
     
-    for target_id in target_users:
-        try:
-            await context.bot.copy_message(target_id, chat_id, message_id)
-            s += 1
-            await asyncio.sleep(0.2)
-        except TelegramError as e:
-            f += 1
-            logger.warning(f"Premium broadcast fail for {target_id}: {e}")
-            
+    # Sends overlap instead of serializing on a fixed sleep; the semaphore
+    # bounds in-flight requests and the bucket keeps us under 30 msg/s.
+    sem, bucket = asyncio.Semaphore(25), _SEND_BUCKET
+
+    async def _send_one(target_id):
+        async with sem:
+            await bucket.acquire()
+            try:
+                await context.bot.copy_message(target_id, chat_id, message_id)
+                return True
+            except RetryAfter as e:
+                bucket.penalize(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                return False
+            except TelegramError as e:
+                logger.warning(f"Premium broadcast fail for {target_id}: {e}")
+                return False
+
+    # Kick off each send as its id streams out of the cursor; the first
+    # copies go out while the sampling query is still producing rows.
+    send_tasks = []
+    async for target_id in db.get_random_users_for_broadcast(user_id, count):
+        send_tasks.append(asyncio.create_task(_send_one(target_id)))
+    results = await asyncio.gather(*send_tasks)
+    s, f = sum(results), len(results) - sum(results)
+
     await db.use_image_broadcast_run(user_id, s)
     await db.update_user_credits(user_id, -cost)
     await message.reply_text(f"✅ Broadcast complete!\n- Sent to: `{s}`\n- Failed: `{f}`\n- Cost: `{cost}` credits", parse_mode=ParseMode.MARKDOWN)
@@ -387,7 +503,7 @@ async def get_broadcast_count(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ConversationHandler.END
 
 async def new_group_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    bot, group = await context.bot.get_me(), update.message.chat
+    bot, group = context.bot_data['me'], update.message.chat
     if bot.id not in [m.id for m in update.message.new_chat_members]: return
 
     if update.message.from_user.is_bot:
@@ -398,8 +514,9 @@ async def new_group_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     adder_user_id = update.message.from_user.id
     
     try:
-        existing_group = await db.get_group(group.id)
-        is_admin = (await context.bot.get_chat_member(group.id, bot.id)).status == 'administrator'
+        existing_group, bot_member = await asyncio.gather(
+            db.get_group(group.id), context.bot.get_chat_member(group.id, bot.id))
+        is_admin = bot_member.status == 'administrator'
 
         if existing_group:
             logger.info(f"Bot re-added to group '{group.title}' ({group.id}). No credits will be awarded.")
@@ -415,8 +532,8 @@ async def new_group_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         if is_admin:
             member_count = await context.bot.get_chat_member_count(group.id)
             if member_count > 600:
-                user = await db.get_user(adder_user_id)
-                reward = 10 if user and user['is_premium'] else 5
+                user = await cache.get_user_cached(adder_user_id)
+                reward = GROUP_BONUSES[bool(user and user['is_premium'])]
                 await db.update_user_credits(adder_user_id, reward)
                 await context.bot.send_message(adder_user_id, f"🎉 Thanks for making me admin in '{group.title}'! You got `{reward}` credits as the group has over 600 members.", parse_mode=ParseMode.MARKDOWN)
                 await context.bot.send_message(group.id, "Hello! I'm ready to receive promotions.")
@@ -432,7 +549,7 @@ async def new_group_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def start_group_share_flow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles the group share flow, showing a confirmation message."""
     query = update.callback_query
-    user = await db.get_user(update.effective_user.id)
+    user = await _load_user(update, context)
     if not user: return
 
     # Check for prerequisites and reply accordingly
@@ -444,7 +561,7 @@ async def start_group_share_flow(update: Update, context: ContextTypes.DEFAULT_T
 
     if not user['normal_promo_text'] or not user['normal_promo_url']:
         text = "You need to set up your 'Normal Link' promotion first.\n /start"
-        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Menu", callback_data="back_to_main")]])
+        keyboard = BACK_TO_MAIN_KB
         if query:
             await query.answer(text, show_alert=True)
             await query.edit_message_text(text,reply_markup=keyboard)
@@ -477,12 +594,12 @@ async def execute_group_share(update: Update, context: ContextTypes.DEFAULT_TYPE
     message = getattr(update, "message", None)
     user_id = update.effective_user.id
 
-    user = await db.get_user(user_id)
+    user = await _load_user(update, context)
     if not user or user['daily_promo_runs'] <= 0 or not user['normal_promo_url']:
         text = "Something went wrong. Please try again."
         if query:
             await query.edit_message_text(
-                text, reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main")]])
+                text, reply_markup=BACK_KB
             )
         elif message:
             await message.reply_text(text)
@@ -511,51 +628,61 @@ async def execute_group_share(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
 
     # Send to groups
-    s_count, f_count = 0, 0
     keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🔗 Visit Link", url=user['normal_promo_url'])]])
-    promo_chat_id = user.get('normal_promo_chat_id')
-    promo_message_id = user.get('normal_promo_message_id')
+    promo_chat_id = user['normal_promo_chat_id']
+    promo_message_id = user['normal_promo_message_id']
 
-    for group_id in groups:
-        try:
-            if promo_chat_id and promo_message_id:
-                sent_message = await context.bot.copy_message(
-                    chat_id=group_id,
-                    from_chat_id=promo_chat_id,
-                    message_id=promo_message_id,
-                )
-                await context.bot.edit_message_reply_markup(
-                    chat_id=group_id,
-                    message_id=sent_message.message_id,
-                    reply_markup=keyboard,
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=group_id,
-                    text=user['normal_promo_text'],
-                    reply_markup=keyboard,
-                    disable_web_page_preview=True,
-                )
-            s_count += 1
-            await asyncio.sleep(0.5)
-        except TelegramError as e:
-            f_count += 1
-            logger.warning(f"Failed to send group share to group {group_id}: {e}")
+    # Groups are distinct chats, so the cross-chat round-trips can overlap;
+    # the bucket keeps the overall rate under Telegram's global send limit.
+    sem, bucket = asyncio.Semaphore(20), _SEND_BUCKET
 
-    # Update DB usage
-    await db.use_promo_run(user_id)
-    updated_user = await db.get_user(user_id)
+    async def _send_to_group(group_id):
+        async with sem:
+            await bucket.acquire()
+            try:
+                if promo_chat_id and promo_message_id:
+                    # copyMessage takes the keyboard directly; no follow-up
+                    # edit_message_reply_markup round-trip per group.
+                    await context.bot.copy_message(
+                        chat_id=group_id,
+                        from_chat_id=promo_chat_id,
+                        message_id=promo_message_id,
+                        reply_markup=keyboard,
+                    )
+                else:
+                    await context.bot.send_message(
+                        chat_id=group_id,
+                        text=user['normal_promo_text'],
+                        reply_markup=keyboard,
+                        disable_web_page_preview=True,
+                    )
+                return True
+            except RetryAfter as e:
+                bucket.penalize(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                return False
+            except TelegramError as e:
+                logger.warning(f"Failed to send group share to group {group_id}: {e}")
+                return False
+
+    results = await asyncio.gather(*(_send_to_group(group_id) for group_id in groups))
+    s_count = sum(results)
+    f_count = len(results) - s_count
+
+    # Update DB usage; the RETURNING value saves re-reading the row.
+    runs_left = await db.use_promo_run(user_id)
+    context.user_data.pop('_user_row', None)
     report_text = (
         f"✅ **Promotion Sent!**\n\n"
         f"- Successfully sent to: `{s_count}` groups\n"
         f"- Failed to send to: `{f_count}` groups\n\n"
-        f"You have `{updated_user['daily_promo_runs']}` group promotion runs left today."
+        f"You have `{runs_left or 0}` group promotion runs left today."
     )
 
     if query:
         await query.edit_message_text(
             report_text,
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back to Menu", callback_data="back_to_main")]]),
+            reply_markup=BACK_TO_MAIN_KB,
             parse_mode=ParseMode.MARKDOWN,
         )
     elif message:
@@ -563,20 +690,38 @@ async def execute_group_share(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def admin_broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.callback_query.message.reply_text("Send message to broadcast.\n\n/cancel"); return BROADCAST_MESSAGE
 async def get_broadcast_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    message, user_ids = update.message, await db.get_all_user_ids()
-    await message.reply_text(f"Broadcasting to {len(user_ids)} users...")
-    s, f, b = 0, 0, 0
-    for user_id in user_ids:
-        try:
-            await context.bot.copy_message(user_id, message.chat_id, message.message_id)
-            s += 1
-            await asyncio.sleep(0.1)
-        except TelegramError as e:
-            f += 1
-            logger.warning(f"Broadcast failed for {user_id}: {e}")
-            if "blocked" in str(e).lower() or "deactivated" in str(e).lower():
-                b += 1   # Count as blocked/deactivated, but don’t ban
-                # removed: await db.ban_user(user_id, True)
+    message = update.message
+    await message.reply_text("Broadcasting to all users...")
+    # Concurrent fan-out: the semaphore bounds in-flight copies and the
+    # bucket keeps the aggregate rate under Telegram's global limit, so the
+    # broadcast spends its time on the wire instead of in fixed sleeps.
+    sem, bucket = asyncio.Semaphore(50), _SEND_BUCKET
+    tally = Counter()
+
+    async def _send_to_user(user_id):
+        async with sem:
+            await bucket.acquire()
+            try:
+                await context.bot.copy_message(user_id, message.chat_id, message.message_id)
+                tally['sent'] += 1
+            except RetryAfter as e:
+                bucket.penalize(e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                tally['failed'] += 1
+            except Forbidden:
+                # Blocked or deactivated account; counted but never banned.
+                tally['failed'] += 1
+                tally['blocked'] += 1
+            except TelegramError as e:
+                tally['failed'] += 1
+                logger.warning(f"Broadcast failed for {user_id}: {e}")
+
+    # One gather per keyset page keeps the live tasks bounded by the page
+    # size instead of the whole table; the semaphore and bucket still pace
+    # the sends, so a page only drains as fast as the rate limit allows.
+    async for id_batch in db.iter_all_user_ids():
+        await asyncio.gather(*(_send_to_user(user_id) for user_id in id_batch))
+    s, f, b = tally['sent'], tally['failed'], tally['blocked']
 
     report = (
         f"**🚀 Broadcast Complete**\n\n"
@@ -602,34 +747,55 @@ async def get_premium_days(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"✅ User `{user_id}` is now premium for {days} days.", parse_mode=ParseMode.MARKDOWN)
     context.user_data.clear(); await start(update, context); return ConversationHandler.END
 
-async def admin_remove_premium_start(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.callback_query.message.reply_text("Send User ID to remove Premium.\n\n/cancel."); return AWAIT_USER_ID_FOR_REMOVE_PREMIUM
-async def get_user_id_for_remove_premium(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try: user_id = int(update.message.text)
-    except ValueError: await update.message.reply_text("Invalid ID."); return AWAIT_USER_ID_FOR_REMOVE_PREMIUM
-    await db.remove_premium(user_id); await update.message.reply_text(f"✅ Premium removed from user `{user_id}`.", parse_mode=ParseMode.MARKDOWN); await start(update, context); return ConversationHandler.END
-
-async def admin_ban_user_start(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.callback_query.message.reply_text("Send User ID to BAN.\n\n/cancel."); return AWAIT_USER_ID_FOR_BAN
-async def get_user_id_for_ban(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try: user_id = int(update.message.text)
-    except ValueError: await update.message.reply_text("Invalid ID."); return AWAIT_USER_ID_FOR_BAN
-    await db.ban_user(user_id, True); await update.message.reply_text(f"🚫 User `{user_id}` has been banned.", parse_mode=ParseMode.MARKDOWN); await start(update, context); return ConversationHandler.END
-
-async def admin_unban_user_start(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.callback_query.message.reply_text("Send User ID to UNBAN.\n\n/cancel."); return AWAIT_USER_ID_FOR_UNBAN
-async def get_user_id_for_unban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# The four one-step admin flows (remove premium, ban, unban, stats) share a
+# shape — prompt for a user id, apply one action — so a single conversation
+# serves them all and PTB matches one handler's filters instead of four.
+async def _admin_apply_remove_premium(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    await db.remove_premium(user_id); await update.message.reply_text(f"✅ Premium removed from user `{user_id}`.", parse_mode=ParseMode.MARKDOWN)
+
+async def _admin_apply_ban(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    await db.ban_user(user_id, True); await update.message.reply_text(f"🚫 User `{user_id}` has been banned.", parse_mode=ParseMode.MARKDOWN)
+
+async def _admin_apply_unban(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    await db.ban_user(user_id, False); await update.message.reply_text(f"✅ User `{user_id}` has been unbanned.", parse_mode=ParseMode.MARKDOWN)
+
+async def _admin_apply_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    user_data = await cache.get_user_cached(user_id)
+    text = f"No data for user `{user_id}`." if not user_data else f"📊 **Stats for User:** `{user_id}`\n\n" + "\n".join(f" - **{_STAT_LABELS.get(k, k)}:** `{v}`" for k, v in zip(user_data.keys(), user_data))
+    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
+_ADMIN_ID_OPS = {
+    'admin_remove_premium': ("Send User ID to remove Premium.\n\n/cancel.", _admin_apply_remove_premium),
+    'admin_ban_user': ("Send User ID to BAN.\n\n/cancel.", _admin_apply_ban),
+    'admin_unban_user': ("Send User ID to UNBAN.\n\n/cancel.", _admin_apply_unban),
+    'admin_stats': ("Send User ID for stats.\n\n/cancel.", _admin_apply_stats),
+}
+
+# One compiled pattern and one entry coroutine cover every admin flow, so
+# PTB matches a single CallbackQueryHandler instead of one per operation.
+ADMIN_OP_RE = re.compile(r'^admin_(broadcast|add_premium|remove_premium|ban_user|unban_user|stats)$')
+
+async def admin_conversation_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    starter = _ADMIN_STARTERS.get(update.callback_query.data, admin_target_id_start)
+    return await starter(update, context)
+
+async def admin_target_id_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    op = update.callback_query.data
+    context.user_data['_admin_op'] = op
+    await update.callback_query.message.reply_text(_ADMIN_ID_OPS[op][0])
+    return AWAIT_ADMIN_TARGET_ID
+
+async def get_admin_target_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try: user_id = int(update.message.text)
-    except ValueError: await update.message.reply_text("Invalid ID."); return AWAIT_USER_ID_FOR_UNBAN
-    await db.ban_user(user_id, False); await update.message.reply_text(f"✅ User `{user_id}` has been unbanned.", parse_mode=ParseMode.MARKDOWN); await start(update, context); return ConversationHandler.END
-
-async def admin_get_stats_start(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.callback_query.message.reply_text("Send User ID for stats.\n\n/cancel."); return AWAIT_USER_ID_FOR_STATS
-async def get_user_id_for_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try: user_id = int(update.message.text)
-    except ValueError: await update.message.reply_text("Invalid ID."); return AWAIT_USER_ID_FOR_STATS
-    user_data = await db.get_user(user_id)
-    text = f"No data for user `{user_id}`." if not user_data else f"📊 **Stats for User:** `{user_id}`\n\n" + "\n".join([f" - **{k.replace('_', ' ').title()}:** `{v}`" for k,v in user_data.items()])
-    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN); await start(update, context); return ConversationHandler.END
+    except ValueError: await update.message.reply_text("Invalid ID."); return AWAIT_ADMIN_TARGET_ID
+    op = context.user_data.pop('_admin_op', None)
+    if op is None: return ConversationHandler.END
+    await _ADMIN_ID_OPS[op][1](update, context, user_id)
+    await start(update, context); return ConversationHandler.END
 
 async def admin_feature_flags(update: Update, context: ContextTypes.DEFAULT_TYPE, is_edit: bool = False):
-    flags, keyboard = await db.get_all_feature_flags(), await feature_flags_keyboard(await db.get_all_feature_flags())
+    flags = await db.get_all_feature_flags()
+    keyboard = await feature_flags_keyboard(flags)
     text = "⚙️ **Feature Control Panel**\n\nEnable or disable features for all users."
     if update.callback_query: await update.callback_query.edit_message_text(text, reply_markup=keyboard)
     else: await update.message.reply_text(text, reply_markup=keyboard)
@@ -642,10 +808,48 @@ async def handle_report_forward(update: Update, context: ContextTypes.DEFAULT_TY
     if not context.user_data.get('promoter_to_report'): return
     promoter_id, reporter = context.user_data['promoter_to_report'], update.effective_user
     report_message = f"⚠️ **New Report**\n\n**Reporter:** @{reporter.username} (`{reporter.id}`)\n**Reported User ID:** `{promoter_id}`"
-    for admin_id in config.ADMIN_IDS:
+    async def _notify_admin(admin_id):
         try:
-            await context.bot.send_message(admin_id, report_message, parse_mode=ParseMode.MARKDOWN)
-            await context.bot.forward_message(admin_id, update.message.chat_id, update.message.message_id)
+            # The summary and the forwarded evidence are independent sends.
+            await asyncio.gather(
+                context.bot.send_message(admin_id, report_message, parse_mode=ParseMode.MARKDOWN),
+                context.bot.forward_message(admin_id, update.message.chat_id, update.message.message_id),
+            )
         except TelegramError as e: logger.error(f"Failed to send report to admin {admin_id}: {e}")
+
+    # Admins are independent recipients; notify them all at once.
+    await asyncio.gather(*(_notify_admin(admin_id) for admin_id in config.ADMIN_IDS), return_exceptions=True)
     await update.message.reply_text("✅ Report sent to administrators.")
     context.user_data.clear(); await start(update, context)
+
+
+# Built once at import instead of per callback press; button_handler just
+# does a dict lookup. Lives after the handler definitions it references.
+_BUTTON_ACTIONS = {
+    'promote_link': _show_promote_menu,
+    'start_group_share': start_group_share_flow,
+    'execute_group_share_final': execute_group_share,
+    'earn_credits': tasks,
+    'referral_link': referral,
+    'leaderboard': leaderboard,
+    'premium_upgrade': premium_info,
+    'add_to_group': add_to_group,
+    'my_account': my_account,
+    'back_to_main': start,
+    'admin_feature_flags': admin_feature_flags,
+    'admin_back': start,
+}
+
+_PREFIX_ACTIONS = {
+    'claim': handle_claim_promo,
+    'verify': handle_verify_promo,
+    'report': handle_report_start,
+    'toggle': _toggle_flag,
+}
+
+# Multi-step admin flows keep their own starters; everything else in
+# ADMIN_OP_RE falls through to the shared target-id flow.
+_ADMIN_STARTERS = {
+    'admin_broadcast': admin_broadcast_start,
+    'admin_add_premium': admin_add_premium_start,
+}
@@ -13,17 +13,17 @@ import database as db
 
 logger = logging.getLogger(__name__)
 
-async def daily_credit_reset(context: ContextTypes.DEFAULT_TYPE) -> None:
+async def midnight_reset(context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Resets daily limits and adds referral credits for all users.
-    This job runs once every 24 hours.
+    Resets daily limits, adds referral credits, and restores premium image
+    broadcast quotas for all users. Both resets fire at midnight, so one
+    job runs them in a single transaction.
     """
-    logger.info("Running daily credit reset job...")
+    logger.info("Running midnight reset job...")
     
-    # Logic to add referral credits to main credits and reset daily runs
-    await db.execute_daily_reset()
+    await db.execute_midnight_reset()
     
-    logger.info("Daily credit reset job completed.")
+    logger.info("Midnight reset job completed.")
 
 async def weekly_leaderboard_reset(context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -37,14 +37,4 @@ async def weekly_leaderboard_reset(context: ContextTypes.DEFAULT_TYPE) -> None:
     
     logger.info("Weekly leaderboard reset job completed.")
 
-async def reset_image_broadcasts(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """
-    Resets the 'image_broadcasts_left' counter for all premium users.
-    This job runs once every 24 hours.
-    """
-    logger.info("Running daily reset for premium image broadcasts...")
-    
-    await db.reset_all_premium_image_broadcasts()
-    
-    logger.info("Premium image broadcast limits reset.")
 
@@ -8,12 +8,15 @@ schedules the recurring jobs from the 'jobs' module, and starts the polling proc
 
 import logging
 from datetime import time
+from telegram import Update
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
     ConversationHandler,
+    PicklePersistence,
+    TypeHandler,
     filters,
 )
 # The CronTrigger is needed for the custom weekly job
@@ -35,6 +38,17 @@ logging.getLogger('telegram.ext').setLevel(logging.INFO)
 
 logger = logging.getLogger(__name__)
 
+class BotPersistence(PicklePersistence):
+    """PicklePersistence that never stores the per-update user-row memo.
+
+    '_user_row' is scratch state valid only within one update; pickling it
+    would resurrect a stale row after a restart.
+    """
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        await super().update_user_data(user_id, {k: v for k, v in data.items() if k != '_user_row'})
+
+
 async def post_init(application: Application) -> None:
     """
     A function to run after the bot is initialized but before polling starts.
@@ -43,12 +57,25 @@ async def post_init(application: Application) -> None:
     logger.info("Initializing database...")
     await db.initialize_database()
     logger.info("Database initialized.")
+    # The bot's own identity never changes while the process runs; fetch it
+    # once so handlers don't pay a getMe round-trip per click.
+    application.bot_data['me'] = await application.bot.get_me()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Releases the database connection pool when the bot stops."""
+    await db.close_pool()
 
 
 def main() -> None:
     """Start the bot."""
     # --- Application Setup ---
-    application = Application.builder().token(config.BOT_TOKEN).post_init(post_init).build()
+    # The database layer is fully async, so updates can safely be processed
+    # concurrently instead of strictly one at a time.
+    # Conversation state survives restarts, so multi-step flows (set link,
+    # budgets, broadcasts) resume where they left off instead of starting over.
+    persistence = BotPersistence(filepath='bot_state.pkl')
+    application = Application.builder().token(config.BOT_TOKEN).persistence(persistence).concurrent_updates(True).post_init(post_init).post_shutdown(post_shutdown).build()
     
     # === Conversation Handlers ===
 
@@ -60,7 +87,7 @@ def main() -> None:
             handlers.LINK_URL: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_link_url)]
         },
         fallbacks=[CommandHandler('cancel', handlers.cancel_conversation), CallbackQueryHandler(handlers.start)],
-        per_message=False,
+        per_message=False, persistent=True, name='promote_normal_link',
     )
     
     # 2. User: Set Force-Join Channel
@@ -70,7 +97,7 @@ def main() -> None:
             handlers.CHANNEL_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_channel_id)]
         },
         fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)],
-        per_message=False,
+        per_message=False, persistent=True, name='force_channel',
     )
     
     # 3. User: Create a Promotion (select type & budget)
@@ -81,7 +108,7 @@ def main() -> None:
             handlers.AWAIT_BUDGET: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_promotion_budget)]
         },
         fallbacks=[CommandHandler('cancel', handlers.cancel_conversation), CallbackQueryHandler(handlers.start, pattern='^back_to_main$')],
-        per_message=False,
+        per_message=False, persistent=True, name='create_promotion',
     )
     
     # 4. Premium User: Image with Caption Broadcast
@@ -92,39 +119,30 @@ def main() -> None:
             handlers.AWAIT_BROADCAST_COUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_broadcast_count)]
         },
         fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)],
-        per_message=False,
+        per_message=False, persistent=True, name='premium_broadcast',
     )
     
     # --- Admin Conversation Handlers ---
     
-    # 5. Admin: Broadcast Message
-    broadcast_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(handlers.admin_broadcast_start, pattern='^admin_broadcast$')],
-        states={
-            handlers.BROADCAST_MESSAGE: [MessageHandler(filters.ALL & ~filters.COMMAND, handlers.get_broadcast_message)]
-        },
-        fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)],
-        per_message=False,
-    )
-    
-    # 6. Admin: Add Premium
-    add_premium_handler = ConversationHandler(
-        entry_points=[CallbackQueryHandler(handlers.admin_add_premium_start, pattern='^admin_add_premium$')],
+    # 5. Admin: one conversation for every admin flow. A single compiled
+    # pattern routes the entry, and the merged states dict carries the
+    # broadcast, add-premium and target-id steps.
+    admin_handler = ConversationHandler(
+        entry_points=[CallbackQueryHandler(handlers.admin_conversation_start, pattern=handlers.ADMIN_OP_RE)],
         states={
+            handlers.BROADCAST_MESSAGE: [MessageHandler(filters.ALL & ~filters.COMMAND, handlers.get_broadcast_message)],
             handlers.AWAIT_USER_ID_FOR_PREMIUM: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_user_id_for_premium)],
-            handlers.AWAIT_PREMIUM_DAYS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_premium_days)]
+            handlers.AWAIT_PREMIUM_DAYS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_premium_days)],
+            handlers.AWAIT_ADMIN_TARGET_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_admin_target_id)]
         },
         fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)],
-        per_message=False,
+        per_message=False, persistent=True, name='admin_ops',
     )
-    
-    # 7. Other Admin Handlers (single step)
-    remove_premium_handler = ConversationHandler(entry_points=[CallbackQueryHandler(handlers.admin_remove_premium_start, pattern='^admin_remove_premium$')], states={handlers.AWAIT_USER_ID_FOR_REMOVE_PREMIUM: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_user_id_for_remove_premium)]}, fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)], per_message=False)
-    ban_handler = ConversationHandler(entry_points=[CallbackQueryHandler(handlers.admin_ban_user_start, pattern='^admin_ban_user$')], states={handlers.AWAIT_USER_ID_FOR_BAN: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_user_id_for_ban)]}, fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)], per_message=False)
-    unban_handler = ConversationHandler(entry_points=[CallbackQueryHandler(handlers.admin_unban_user_start, pattern='^admin_unban_user$')], states={handlers.AWAIT_USER_ID_FOR_UNBAN: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_user_id_for_unban)]}, fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)], per_message=False)
-    stats_handler = ConversationHandler(entry_points=[CallbackQueryHandler(handlers.admin_get_stats_start, pattern='^admin_stats$')], states={handlers.AWAIT_USER_ID_FOR_STATS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handlers.get_user_id_for_stats)]}, fallbacks=[CommandHandler('cancel', handlers.cancel_conversation)], per_message=False)
 
     # --- Handler Registration ---
+    # Group -1 runs before every other handler for each update, so nothing
+    # below can read a user row memoized by a previous interaction.
+    application.add_handler(TypeHandler(Update, handlers.reset_update_memo), group=-1)
     application.add_handler(CommandHandler('start', handlers.start))
     application.add_handler(CommandHandler('group', handlers.group_command))
     
@@ -133,12 +151,7 @@ def main() -> None:
     application.add_handler(force_channel_handler)
     application.add_handler(create_promotion_handler)
     application.add_handler(premium_broadcast_handler)
-    application.add_handler(broadcast_handler)
-    application.add_handler(add_premium_handler)
-    application.add_handler(remove_premium_handler)
-    application.add_handler(ban_handler)
-    application.add_handler(unban_handler)
-    application.add_handler(stats_handler)
+    application.add_handler(admin_handler)
     
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handlers.new_group_member))
     application.add_handler(MessageHandler(filters.FORWARDED, handlers.handle_report_forward))
@@ -146,8 +159,7 @@ def main() -> None:
 
     # --- Job Queue Setup ---
     job_queue = application.job_queue
-    job_queue.run_daily(jobs.daily_credit_reset, time=time(0, 0), name="daily_reset")
-    job_queue.run_daily(jobs.reset_image_broadcasts, time=time(0, 0), name="daily_image_broadcast_reset")
+    job_queue.run_daily(jobs.midnight_reset, time=time(0, 0), name="midnight_reset")
     
     # Corrected method for scheduling weekly job for PTB v20+
     job_queue.run_custom(